@@ -4,28 +4,312 @@ API server for StartupBridge platform with PostgreSQL backend
 """
 import os
 import json
+import math
+import time
+import threading
+import itertools
+import heapq
+import functools
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, g, has_request_context
 from flask_cors import CORS
 from datetime import datetime
+from decimal import Decimal
 
 app = Flask(__name__)
 CORS(app)
 
 # Database connection
-def get_db_connection():
+# Read replicas are listed in PG_REPLICA_HOSTS as comma-separated host[:port]
+# entries and share PGDATABASE/PGUSER/PGPASSWORD with the primary.
+PG_REPLICA_HOSTS = [h.strip() for h in os.environ.get('PG_REPLICA_HOSTS', '').split(',') if h.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 2))
+REPLICA_CONNECT_TIMEOUT = int(os.environ.get('REPLICA_CONNECT_TIMEOUT', 2))
+# Read-your-writes pins live in a per-process map, so they only hold for reads
+# served by the same worker that handled the write. Under several workers or
+# instances, clients that need their own writes back must send
+# "X-Read-Primary: 1" on the follow-up read.
+READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 10))
+
+_replica_counter = itertools.count()
+_replica_lag = {}  # host -> (checked_at, lag_seconds or None)
+_recent_writes = {}  # pin key -> written_at
+_routing_lock = threading.Lock()
+_db_metrics = {}  # target -> counters
+
+def _connect(host, port, connect_timeout=None):
     return psycopg2.connect(
-        host=os.environ.get('PGHOST'),
+        host=host,
         database=os.environ.get('PGDATABASE'),
         user=os.environ.get('PGUSER'),
         password=os.environ.get('PGPASSWORD'),
-        port=os.environ.get('PGPORT'),
+        port=port,
+        connect_timeout=connect_timeout,
         cursor_factory=RealDictCursor
     )
 
+def _record_metric(target, counter, value=1):
+    with _routing_lock:
+        metrics = _db_metrics.setdefault(target, {
+            'connections': 0, 'errors': 0, 'fallbacks': 0, 'lag_seconds': None
+        })
+        if counter == 'lag_seconds':
+            metrics[counter] = value
+        else:
+            metrics[counter] += value
+
+def get_db_connection():
+    """Connect to the primary; used for all writes"""
+    try:
+        conn = _connect(os.environ.get('PGHOST'), os.environ.get('PGPORT'))
+    except Exception:
+        _record_metric('primary', 'errors')
+        raise
+    _record_metric('primary', 'connections')
+    return conn
+
+def mark_written(*keys):
+    """Pin reads for these keys to the primary while replicas catch up"""
+    now = time.monotonic()
+    with _routing_lock:
+        for key in keys:
+            _recent_writes[key] = now
+        # Drop expired pins so the map stays bounded
+        if len(_recent_writes) > 10000:
+            for key in [k for k, t in _recent_writes.items() if now - t > READ_YOUR_WRITES_SECONDS]:
+                del _recent_writes[key]
+
+def _is_pinned(keys):
+    if has_request_context() and request.headers.get('X-Read-Primary', '').lower() in ('1', 'true', 'yes'):
+        return True
+    now = time.monotonic()
+    with _routing_lock:
+        return any(now - _recent_writes.get(key, float('-inf')) < READ_YOUR_WRITES_SECONDS for key in keys)
+
+def _mark_replica_down(host):
+    """Skip this replica until its next lag check is due"""
+    with _routing_lock:
+        _replica_lag[host] = (time.monotonic(), None)
+    _record_metric(f'replica:{host}', 'lag_seconds', None)
+
+def _replica_known_unhealthy(host):
+    """True if a recent check found the replica down or lagging"""
+    with _routing_lock:
+        checked = _replica_lag.get(host)
+    if not checked or time.monotonic() - checked[0] >= REPLICA_LAG_CHECK_INTERVAL:
+        return False
+    return checked[1] is None or checked[1] > REPLICA_MAX_LAG_SECONDS
+
+def _replica_lag_ok(host, conn):
+    """Check replication lag, re-querying at most every REPLICA_LAG_CHECK_INTERVAL"""
+    now = time.monotonic()
+    with _routing_lock:
+        checked = _replica_lag.get(host)
+    if checked and now - checked[0] < REPLICA_LAG_CHECK_INTERVAL:
+        lag = checked[1]
+    else:
+        cur = conn.cursor()
+        # An idle primary sends no new WAL, so a fully replayed replica only
+        # counts as caught up while its WAL receiver is streaming and has heard
+        # from the primary recently; a broken stream reports NULL (unhealthy).
+        # The primary sends keepalives every wal_sender_timeout / 2, so keep that
+        # below REPLICA_MAX_LAG_SECONDS or idle replicas will fall back to the
+        # primary. Reading pg_stat_wal_receiver needs pg_read_all_stats.
+        cur.execute("""
+            SELECT CASE
+                WHEN NOT pg_is_in_recovery() THEN 0
+                WHEN NOT EXISTS (
+                    SELECT 1 FROM pg_stat_wal_receiver
+                    WHERE status = 'streaming'
+                      AND last_msg_receipt_time > now() - make_interval(secs => %s)
+                ) THEN NULL
+                WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+            END as lag
+        """, (REPLICA_MAX_LAG_SECONDS,))
+        row = cur.fetchone()
+        cur.close()
+        lag = float(row['lag']) if row['lag'] is not None else None
+        with _routing_lock:
+            _replica_lag[host] = (now, lag)
+        _record_metric(f'replica:{host}', 'lag_seconds', lag)
+    return lag is not None and lag <= REPLICA_MAX_LAG_SECONDS
+
+def get_read_connection(*pin_keys):
+    """Connect to a replica for read-only work, falling back to the primary"""
+    if not PG_REPLICA_HOSTS or _is_pinned(pin_keys):
+        return get_db_connection()
+    
+    start = next(_replica_counter)
+    for i in range(len(PG_REPLICA_HOSTS)):
+        entry = PG_REPLICA_HOSTS[(start + i) % len(PG_REPLICA_HOSTS)]
+        host, _, port = entry.partition(':')
+        target = f'replica:{entry}'
+        if _replica_known_unhealthy(entry):
+            continue
+        conn = None
+        try:
+            conn = _connect(host, port or os.environ.get('PGPORT'), REPLICA_CONNECT_TIMEOUT)
+            conn.set_session(readonly=True)
+            if _replica_lag_ok(entry, conn):
+                _record_metric(target, 'connections')
+                return conn
+        except Exception as e:
+            print(f"Error using replica {entry}: {e}")
+            _record_metric(target, 'errors')
+            _mark_replica_down(entry)
+        if conn is not None:
+            conn.close()
+    
+    _record_metric('primary', 'fallbacks')
+    return get_db_connection()
+
+# Admission control
+# Each endpoint class gets a concurrency limit and a bounded wait queue; when
+# the queue is full (or the wait times out) the request is shed with a 503.
+PRIORITY_MESSAGING = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_LOGGING = 2
+RETRY_AFTER_SECONDS = int(os.environ.get('ADMISSION_RETRY_AFTER', 1))
+
+class AdmissionLimiter:
+    """Concurrency limiter with a bounded, priority-ordered wait queue"""
+    
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout, yield_to=()):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.yield_to = yield_to
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiters = []  # heap of (priority, seq)
+        self._active = 0
+        self.admitted = 0
+        self.shed = 0
+        self.timeouts = 0
+        self.peak_queue_depth = 0
+    
+    @property
+    def queue_depth(self):
+        return len(self._waiters)
+    
+    def acquire(self, priority=PRIORITY_DEFAULT, queue_timeout=None):
+        """Take a slot, waiting in the queue if needed; False means shed"""
+        # Lower-priority classes back off while the classes they yield to are queueing
+        if any(other.queue_depth for other in self.yield_to):
+            with self._cond:
+                self.shed += 1
+            return False
+        
+        with self._cond:
+            if self._active < self.max_concurrent and not self._waiters:
+                self._active += 1
+                self.admitted += 1
+                return True
+            if len(self._waiters) >= self.max_queue:
+                self.shed += 1
+                return False
+            
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiters, ticket)
+            self.peak_queue_depth = max(self.peak_queue_depth, len(self._waiters))
+            if queue_timeout is None:
+                queue_timeout = self.queue_timeout
+            deadline = time.monotonic() + queue_timeout
+            while self._active >= self.max_concurrent or self._waiters[0] != ticket:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                    self.shed += 1
+                    self.timeouts += 1
+                    self._cond.notify_all()
+                    return False
+                self._cond.wait(remaining)
+            
+            heapq.heappop(self._waiters)
+            self._active += 1
+            self.admitted += 1
+            # The next waiter may fit too if several slots freed at once
+            self._cond.notify_all()
+            return True
+    
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+    
+    def stats(self):
+        with self._cond:
+            return {
+                'active': self._active,
+                'max_concurrent': self.max_concurrent,
+                'queue_depth': len(self._waiters),
+                'max_queue': self.max_queue,
+                'peak_queue_depth': self.peak_queue_depth,
+                'admitted': self.admitted,
+                'shed': self.shed,
+                'timeouts': self.timeouts
+            }
+
+def _limiter_from_env(name, max_concurrent, max_queue, queue_timeout, yield_to=()):
+    prefix = f'ADMISSION_{name.upper()}'
+    return AdmissionLimiter(
+        name,
+        int(os.environ.get(f'{prefix}_CONCURRENCY', max_concurrent)),
+        int(os.environ.get(f'{prefix}_QUEUE', max_queue)),
+        float(os.environ.get(f'{prefix}_QUEUE_TIMEOUT', queue_timeout)),
+        yield_to
+    )
+
+_read_limiter = _limiter_from_env('reads', 20, 50, 2.0)
+_write_limiter = _limiter_from_env('writes', 10, 20, 2.0)
+_logging_limiter = _limiter_from_env('logging', 2, 5, 0.5, yield_to=(_read_limiter, _write_limiter))
+INTERNAL_LOG_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_INTERNAL_LOG_QUEUE_TIMEOUT', 0.25))
+admission_limiters = {
+    'reads': _read_limiter,
+    'writes': _write_limiter,
+    'logging': _logging_limiter
+}
+
+def admit(endpoint_class, priority=PRIORITY_DEFAULT):
+    """Run the endpoint only once its class has a free slot, else return 503"""
+    limiter = admission_limiters[endpoint_class]
+    
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not limiter.acquire(priority):
+                return jsonify({
+                    'success': False,
+                    'error': 'Server is busy, please retry shortly'
+                }), 503, {'Retry-After': str(RETRY_AFTER_SECONDS)}
+            g.admission_class = endpoint_class
+            try:
+                return func(*args, **kwargs)
+            finally:
+                limiter.release()
+        return wrapper
+    return decorator
+
+# Facet cache: filter key -> (expires_at, facets)
+FACET_CACHE_TTL = float(os.environ.get('FACET_CACHE_TTL', 30))
+FACET_CACHE_MAX_ENTRIES = 256
+FUNDING_BUCKETS = [0, 1000000, 5000000, 10000000, 50000000, 100000000]
+_facet_cache = {}
+_facet_cache_lock = threading.Lock()
+
 def log_activity(user_id, action, data=None, level='INFO', user_agent=None, url=None, session_id=None):
     """Log user activity to database"""
+    # Server-side events from other endpoints queue for a logging slot ahead of
+    # client activity logs, and are only dropped while logging is shedding
+    needs_slot = not (has_request_context() and g.get('admission_class') == 'logging')
+    if needs_slot and not _logging_limiter.acquire(PRIORITY_DEFAULT, INTERNAL_LOG_QUEUE_TIMEOUT):
+        print(f"Dropped activity log '{action}': logging is shedding load")
+        return
     try:
         conn = get_db_connection()
         cur = conn.cursor()
@@ -38,9 +322,13 @@ def log_activity(user_id, action, data=None, level='INFO', user_agent=None, url=
         conn.close()
     except Exception as e:
         print(f"Error logging activity: {e}")
+    finally:
+        if needs_slot:
+            _logging_limiter.release()
 
 # User Management Endpoints
 @app.route('/api/users', methods=['POST'])
+@admit('writes')
 def create_user():
     """Create or update user profile"""
     try:
@@ -77,6 +365,8 @@ def create_user():
         cur.close()
         conn.close()
         
+        mark_written(f'user:{firebase_uid}')
+        
         log_activity(user['id'], 'user_profile_created', {'email': email, 'role': role})
         
         return jsonify({
@@ -88,10 +378,11 @@ def create_user():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/users/<firebase_uid>', methods=['GET'])
+@admit('reads')
 def get_user(firebase_uid):
     """Get user profile by Firebase UID"""
     try:
-        conn = get_db_connection()
+        conn = get_read_connection(f'user:{firebase_uid}')
         cur = conn.cursor()
         
         cur.execute("""
@@ -116,11 +407,126 @@ def get_user(firebase_uid):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# NULL ratings/views sort as 0 so keyset comparisons never see NULLs; these
+# expressions match the idx_users_*_sort indexes in database_setup.py
+DIRECTORY_SORT_COLUMNS = {'rating': 'COALESCE(u.rating, 0)', 'profile_views': 'COALESCE(u.profile_views, 0)'}
+DIRECTORY_MAX_LIMIT = 100
+
+@app.route('/api/users', methods=['GET'])
+@admit('reads')
+def get_users():
+    """Browse the user directory, or batch-resolve profiles with ?uids=a,b,c"""
+    try:
+        uids = [uid.strip() for uid in request.args.get('uids', '').split(',') if uid.strip()]
+        
+        if uids:
+            if len(uids) > DIRECTORY_MAX_LIMIT:
+                return jsonify({
+                    'success': False,
+                    'error': f'Too many uids: at most {DIRECTORY_MAX_LIMIT} per request'
+                }), 400
+            conn = get_read_connection(*[f'user:{uid}' for uid in uids])
+            cur = conn.cursor()
+            
+            cur.execute("""
+                SELECT id, firebase_uid, name, role, company, bio, location,
+                       profile_views, connections, rating
+                FROM users
+                WHERE firebase_uid = ANY(%s)
+            """, (uids,))
+            
+            by_uid = {user['firebase_uid']: dict(user) for user in cur.fetchall()}
+            cur.close()
+            conn.close()
+            
+            return jsonify({
+                'success': True,
+                'users': [by_uid[uid] for uid in uids if uid in by_uid]
+            })
+        
+        role = request.args.get('role')
+        location = request.args.get('location')
+        search = request.args.get('search', '').strip()
+        sort = request.args.get('sort', 'rating')
+        cursor = request.args.get('cursor')
+        try:
+            limit = parse_number_arg(request.args, 'limit', int)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        if limit is None:
+            limit = 20
+        if limit < 1:
+            return jsonify({'success': False, 'error': f'Invalid limit: {limit}'}), 400
+        limit = min(limit, DIRECTORY_MAX_LIMIT)
+        
+        if sort not in DIRECTORY_SORT_COLUMNS:
+            return jsonify({'success': False, 'error': f'Invalid sort: {sort}'}), 400
+        sort_column = DIRECTORY_SORT_COLUMNS[sort]
+        
+        query = f"""
+            SELECT u.id, u.firebase_uid, u.name, u.role, u.company, u.bio, u.location,
+                   u.profile_views, u.connections, u.rating, {sort_column} as sort_value
+            FROM users u
+            WHERE TRUE
+        """
+        params = []
+        
+        if role:
+            query += " AND u.role = %s"
+            params.append(role)
+        
+        if location:
+            query += " AND u.location = %s"
+            params.append(location)
+        
+        if search:
+            # Substring or trigram-similar match, both served by the trigram GIN indexes
+            query += """ AND (u.name ILIKE %s OR u.company ILIKE %s
+                              OR u.name %% %s OR u.company %% %s)"""
+            search_param = f"%{search}%"
+            params.extend([search_param, search_param, search, search])
+        
+        # Keyset pagination: cursor is "<sort value>:<id>" of the last row seen
+        if cursor:
+            try:
+                cursor_value, cursor_id = cursor.rsplit(':', 1)
+                cursor_id = int(cursor_id)
+                cursor_value = Decimal(cursor_value) if sort == 'rating' else int(cursor_value)
+            except (ValueError, ArithmeticError):
+                return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+            query += f" AND ({sort_column}, u.id) < (%s, %s)"
+            params.extend([cursor_value, cursor_id])
+        
+        query += f" ORDER BY {sort_column} DESC, u.id DESC LIMIT %s"
+        params.append(limit)
+        
+        conn = get_read_connection()
+        cur = conn.cursor()
+        cur.execute(query, params)
+        users = cur.fetchall()
+        cur.close()
+        conn.close()
+        
+        next_cursor = None
+        if len(users) == limit:
+            last = users[-1]
+            next_cursor = f"{last['sort_value']}:{last['id']}"
+        
+        return jsonify({
+            'success': True,
+            'users': [{k: v for k, v in user.items() if k != 'sort_value'} for user in users],
+            'next_cursor': next_cursor
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/users/<firebase_uid>/stats', methods=['GET'])
+@admit('reads')
 def get_user_stats(firebase_uid):
     """Get user statistics"""
     try:
-        conn = get_db_connection()
+        conn = get_read_connection(f'user:{firebase_uid}')
         cur = conn.cursor()
         
         # Get user ID
@@ -164,6 +570,7 @@ def get_user_stats(firebase_uid):
 
 # Posts Management Endpoints
 @app.route('/api/posts', methods=['POST'])
+@admit('writes')
 def create_post():
     """Create a new post"""
     try:
@@ -201,6 +608,8 @@ def create_post():
         cur.close()
         conn.close()
         
+        mark_written(f'user:{firebase_uid}')
+        
         log_activity(user_id, 'post_created', {'post_id': post['id'], 'type': post['type']})
         
         return jsonify({
@@ -211,64 +620,189 @@ def create_post():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def parse_number_arg(args, name, cast):
+    """Parse an optional numeric query arg, raising ValueError if it is malformed"""
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        number = cast(value)
+    except ValueError:
+        raise ValueError(f'Invalid {name}: {value}')
+    if not math.isfinite(number):
+        raise ValueError(f'Invalid {name}: {value}')
+    return number
+
+def build_post_filters(args):
+    """Build the (facet dimension, predicate, params) filters for the posts listing"""
+    post_type = args.get('type')
+    category = args.get('category')
+    user_firebase_uid = args.get('user_firebase_uid')
+    search = args.get('search', '')
+    min_funding = parse_number_arg(args, 'min_funding', int)
+    max_funding = parse_number_arg(args, 'max_funding', int)
+    max_interest_rate = parse_number_arg(args, 'max_interest_rate', float)
+    
+    # Filters tagged with a dimension are left out when counting that dimension's facet
+    filters = [(None, "p.status = 'active'", [])]
+    
+    if post_type:
+        filters.append(('type', "p.type = %s", [post_type]))
+    
+    if category:
+        filters.append(('category', "p.category = %s", [category]))
+    
+    if user_firebase_uid:
+        filters.append((None, "u.firebase_uid = %s", [user_firebase_uid]))
+    
+    if min_funding is not None:
+        filters.append(('funding_amount', "p.funding_amount >= %s", [min_funding]))
+    
+    if max_funding is not None:
+        filters.append(('funding_amount', "p.funding_amount <= %s", [max_funding]))
+    
+    if max_interest_rate is not None:
+        filters.append((None, "p.interest_rate <= %s", [max_interest_rate]))
+    
+    if search:
+        search_param = f"%{search}%"
+        filters.append((None, "(p.title ILIKE %s OR p.description ILIKE %s OR p.category ILIKE %s)",
+                        [search_param, search_param, search_param]))
+    
+    return filters
+
+def combine_post_filters(filters, dimensions=None):
+    """AND together the filters, optionally only those of the given dimensions"""
+    selected = [f for f in filters if dimensions is None or f[0] in dimensions]
+    if not selected:
+        return 'TRUE', []
+    where = ' AND '.join(clause for _, clause, _ in selected)
+    params = [param for _, _, clause_params in selected for param in clause_params]
+    return where, params
+
+def get_post_facets(cur, filters):
+    """Count posts per type, category and funding bucket in a single query.
+    
+    Facets are disjunctive: each dimension is counted with every filter
+    applied except its own, so the UI can still show the alternatives.
+    """
+    cache_key = tuple((dim, clause, tuple(params)) for dim, clause, params in filters)
+    now = time.monotonic()
+    with _facet_cache_lock:
+        cached = _facet_cache.get(cache_key)
+        if cached and cached[0] > now:
+            return cached[1]
+    
+    base_where, base_params = combine_post_filters(filters, [None])
+    type_where, type_params = combine_post_filters(filters, ['type'])
+    category_where, category_params = combine_post_filters(filters, ['category'])
+    funding_where, funding_params = combine_post_filters(filters, ['funding_amount'])
+    
+    cur.execute(f"""
+        SELECT type, category, funding_bucket,
+               GROUPING(type) as no_type,
+               GROUPING(category) as no_category,
+               COUNT(*) FILTER (WHERE match_category AND match_funding) as type_count,
+               COUNT(*) FILTER (WHERE match_type AND match_funding) as category_count,
+               COUNT(*) FILTER (WHERE match_type AND match_category) as funding_count
+        FROM (
+            SELECT p.type, p.category,
+                   width_bucket(p.funding_amount, %s::bigint[]) as funding_bucket,
+                   ({type_where}) as match_type,
+                   ({category_where}) as match_category,
+                   ({funding_where}) as match_funding
+            FROM posts p
+            JOIN users u ON p.user_id = u.id
+            WHERE {base_where}
+        ) f
+        GROUP BY GROUPING SETS ((type), (category), (funding_bucket))
+    """, [FUNDING_BUCKETS] + type_params + category_params + funding_params + base_params)
+    
+    facets = {'type': {}, 'category': {}, 'funding_amount': []}
+    bucket_counts = {}
+    for row in cur.fetchall():
+        if not row['no_type']:
+            if row['type_count']:
+                facets['type'][row['type']] = row['type_count']
+        elif not row['no_category']:
+            if row['category_count']:
+                facets['category'][row['category']] = row['category_count']
+        elif row['funding_bucket'] is not None:
+            bucket_counts[row['funding_bucket']] = row['funding_count']
+    
+    # width_bucket returns 1..len(FUNDING_BUCKETS) for amounts at or above the first edge
+    for i, lower in enumerate(FUNDING_BUCKETS):
+        upper = FUNDING_BUCKETS[i + 1] if i + 1 < len(FUNDING_BUCKETS) else None
+        facets['funding_amount'].append({
+            'min': lower,
+            'max': upper,
+            'count': bucket_counts.get(i + 1, 0)
+        })
+    
+    with _facet_cache_lock:
+        if len(_facet_cache) >= FACET_CACHE_MAX_ENTRIES:
+            for key in [k for k, v in _facet_cache.items() if v[0] <= now]:
+                del _facet_cache[key]
+            if len(_facet_cache) >= FACET_CACHE_MAX_ENTRIES:
+                _facet_cache.clear()
+        _facet_cache[cache_key] = (now + FACET_CACHE_TTL, facets)
+    
+    return facets
+
 @app.route('/api/posts', methods=['GET'])
+@admit('reads')
 def get_posts():
-    """Get posts with filters"""
+    """Get posts with filters, optionally with facet counts"""
     try:
-        post_type = request.args.get('type')
-        category = request.args.get('category')
-        user_firebase_uid = request.args.get('user_firebase_uid')
         limit = int(request.args.get('limit', 20))
-        search = request.args.get('search', '')
+        include_facets = request.args.get('facets', '').lower() in ('1', 'true', 'yes')
         
-        conn = get_db_connection()
+        try:
+            filters = build_post_filters(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        where, params = combine_post_filters(filters)
+        
+        pin_keys = []
+        if request.args.get('user_firebase_uid'):
+            pin_keys.append(f"user:{request.args.get('user_firebase_uid')}")
+        
+        conn = get_read_connection(*pin_keys)
         cur = conn.cursor()
         
         # Build query
-        query = """
+        query = f"""
             SELECT p.id, p.type, p.title, p.description, p.category, p.funding_amount, 
                    p.loan_amount, p.interest_rate, p.status, p.views, p.responses, p.created_at,
                    u.name as user_name, u.email as user_email, u.company as user_company
             FROM posts p
             JOIN users u ON p.user_id = u.id
-            WHERE p.status = 'active'
+            WHERE {where}
+            ORDER BY p.created_at DESC LIMIT %s
         """
-        params = []
-        
-        if post_type:
-            query += " AND p.type = %s"
-            params.append(post_type)
-        
-        if category:
-            query += " AND p.category = %s"
-            params.append(category)
         
-        if user_firebase_uid:
-            query += " AND u.firebase_uid = %s"
-            params.append(user_firebase_uid)
-        
-        if search:
-            query += " AND (p.title ILIKE %s OR p.description ILIKE %s OR p.category ILIKE %s)"
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param, search_param])
+        cur.execute(query, params + [limit])
+        posts = cur.fetchall()
         
-        query += " ORDER BY p.created_at DESC LIMIT %s"
-        params.append(limit)
+        facets = get_post_facets(cur, filters) if include_facets else None
         
-        cur.execute(query, params)
-        posts = cur.fetchall()
         cur.close()
         conn.close()
         
-        return jsonify({
+        response = {
             'success': True,
             'posts': [dict(post) for post in posts]
-        })
+        }
+        if include_facets:
+            response['facets'] = facets
+        
+        return jsonify(response)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/posts/<int:post_id>', methods=['GET'])
+@admit('writes')
 def get_post(post_id):
     """Get single post and increment view count"""
     try:
@@ -306,6 +840,7 @@ def get_post(post_id):
 
 # Messaging Endpoints
 @app.route('/api/conversations', methods=['POST'])
+@admit('writes', PRIORITY_MESSAGING)
 def create_conversation():
     """Create a new conversation"""
     try:
@@ -344,6 +879,8 @@ def create_conversation():
         cur.close()
         conn.close()
         
+        mark_written(f'conversation:{conversation_id}', *[f'user:{uid}' for uid in participants_uids])
+        
         return jsonify({
             'success': True,
             'conversation_id': conversation_id,
@@ -354,10 +891,11 @@ def create_conversation():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/conversations/<firebase_uid>', methods=['GET'])
+@admit('reads', PRIORITY_MESSAGING)
 def get_conversations(firebase_uid):
     """Get user's conversations"""
     try:
-        conn = get_db_connection()
+        conn = get_read_connection(f'user:{firebase_uid}')
         cur = conn.cursor()
         
         # Get user ID
@@ -368,17 +906,23 @@ def get_conversations(firebase_uid):
         
         user_id = user_result['id']
         
-        # Get conversations
+        # Get conversations with unread counts past the user's read watermark
         cur.execute("""
             SELECT c.id, c.last_message, c.last_message_time, c.created_at,
                    array_agg(u.name) as participant_names,
-                   array_agg(u.firebase_uid) as participant_uids
+                   array_agg(u.firebase_uid) as participant_uids,
+                   r.last_read_message_id,
+                   (SELECT COUNT(*) FROM messages m
+                    WHERE m.conversation_id = c.id
+                      AND m.id > COALESCE(r.last_read_message_id, 0)
+                      AND m.sender_id <> %s) as unread_count
             FROM conversations c
             JOIN users u ON u.id = ANY(c.participants)
+            LEFT JOIN conversation_reads r ON r.conversation_id = c.id AND r.user_id = %s
             WHERE %s = ANY(c.participants) AND c.status = 'active'
-            GROUP BY c.id, c.last_message, c.last_message_time, c.created_at
+            GROUP BY c.id, c.last_message, c.last_message_time, c.created_at, r.last_read_message_id
             ORDER BY c.last_message_time DESC
-        """, (user_id,))
+        """, (user_id, user_id, user_id))
         
         conversations = cur.fetchall()
         cur.close()
@@ -386,21 +930,23 @@ def get_conversations(firebase_uid):
         
         return jsonify({
             'success': True,
-            'conversations': [dict(conv) for conv in conversations]
+            'conversations': [dict(conv) for conv in conversations],
+            'total_unread': sum(conv['unread_count'] for conv in conversations)
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/conversations/<int:conversation_id>/messages', methods=['GET'])
+@admit('reads', PRIORITY_MESSAGING)
 def get_messages(conversation_id):
     """Get messages for a conversation"""
     try:
-        conn = get_db_connection()
+        conn = get_read_connection(f'conversation:{conversation_id}')
         cur = conn.cursor()
         
         cur.execute("""
-            SELECT m.id, m.text, m.status, m.created_at,
+            SELECT m.id, m.text, m.created_at,
                    u.name as sender_name, u.firebase_uid as sender_uid
             FROM messages m
             JOIN users u ON m.sender_id = u.id
@@ -409,18 +955,30 @@ def get_messages(conversation_id):
         """, (conversation_id,))
         
         messages = cur.fetchall()
+        
+        # Participants' read watermarks, so senders can render read receipts
+        cur.execute("""
+            SELECT u.firebase_uid, r.last_read_message_id
+            FROM conversation_reads r
+            JOIN users u ON r.user_id = u.id
+            WHERE r.conversation_id = %s
+        """, (conversation_id,))
+        
+        read_watermarks = {row['firebase_uid']: row['last_read_message_id'] for row in cur.fetchall()}
         cur.close()
         conn.close()
         
         return jsonify({
             'success': True,
-            'messages': [dict(msg) for msg in messages]
+            'messages': [dict(msg) for msg in messages],
+            'read_watermarks': read_watermarks
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/conversations/<int:conversation_id>/messages', methods=['POST'])
+@admit('writes', PRIORITY_MESSAGING)
 def add_message(conversation_id):
     """Add a message to conversation"""
     try:
@@ -459,6 +1017,8 @@ def add_message(conversation_id):
         cur.close()
         conn.close()
         
+        mark_written(f'conversation:{conversation_id}', f'user:{firebase_uid}')
+        
         return jsonify({
             'success': True,
             'message_id': message['id']
@@ -467,8 +1027,74 @@ def add_message(conversation_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# messages.id is a SERIAL (int4) column
+MAX_MESSAGE_ID = 2147483647
+
+@app.route('/api/conversations/<int:conversation_id>/read', methods=['POST'])
+@admit('writes', PRIORITY_MESSAGING)
+def mark_conversation_read(conversation_id):
+    """Advance the user's read watermark up to a message id (default: latest)"""
+    try:
+        data = request.json
+        firebase_uid = data.get('firebase_uid')
+        up_to_message_id = data.get('up_to_message_id')
+        
+        if up_to_message_id is not None and (
+                not isinstance(up_to_message_id, int) or isinstance(up_to_message_id, bool)
+                or not 1 <= up_to_message_id <= MAX_MESSAGE_ID):
+            return jsonify({'success': False, 'error': f'Invalid up_to_message_id: {up_to_message_id}'}), 400
+        
+        conn = get_db_connection()
+        cur = conn.cursor()
+        
+        # Get reader ID
+        cur.execute("SELECT id FROM users WHERE firebase_uid = %s", (firebase_uid,))
+        user_result = cur.fetchone()
+        if not user_result:
+            return jsonify({'success': False, 'error': 'User not found'}), 404
+        
+        user_id = user_result['id']
+        
+        # Single upsert; the watermark only moves forward and stops at the
+        # newest message that actually exists in the conversation
+        cur.execute("""
+            INSERT INTO conversation_reads (conversation_id, user_id, last_read_message_id)
+            SELECT c.id, %s, m.max_id
+            FROM conversations c
+            CROSS JOIN LATERAL (
+                SELECT MAX(id) as max_id FROM messages
+                WHERE conversation_id = c.id
+                  AND (%s::integer IS NULL OR id <= %s::integer)
+            ) m
+            WHERE c.id = %s AND %s = ANY(c.participants) AND m.max_id IS NOT NULL
+            ON CONFLICT (conversation_id, user_id)
+            DO UPDATE SET
+                last_read_message_id = GREATEST(conversation_reads.last_read_message_id, EXCLUDED.last_read_message_id),
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING last_read_message_id
+        """, (user_id, up_to_message_id, up_to_message_id, conversation_id, user_id))
+        
+        result = cur.fetchone()
+        conn.commit()
+        cur.close()
+        conn.close()
+        
+        if not result:
+            return jsonify({'success': False, 'error': 'Conversation not found or has no messages'}), 404
+        
+        mark_written(f'user:{firebase_uid}', f'conversation:{conversation_id}')
+        
+        return jsonify({
+            'success': True,
+            'last_read_message_id': result['last_read_message_id']
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # Activity Logging Endpoint
 @app.route('/api/activity', methods=['POST'])
+@admit('logging', PRIORITY_LOGGING)
 def log_user_activity():
     """Log user activity"""
     try:
@@ -505,5 +1131,26 @@ def log_user_activity():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Metrics Endpoint
+@app.route('/api/metrics/db', methods=['GET'])
+def get_db_metrics():
+    """Get per-target database routing metrics"""
+    with _routing_lock:
+        metrics = {target: dict(counters) for target, counters in _db_metrics.items()}
+    
+    return jsonify({
+        'success': True,
+        'replicas': PG_REPLICA_HOSTS,
+        'metrics': metrics
+    })
+
+@app.route('/api/metrics/admission', methods=['GET'])
+def get_admission_metrics():
+    """Get queue depth and shed counts per endpoint class"""
+    return jsonify({
+        'success': True,
+        'metrics': {name: limiter.stats() for name, limiter in admission_limiters.items()}
+    })
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=3000, debug=True)
\ No newline at end of file
@@ -87,6 +87,17 @@ def create_tables():
         )
     """)
     
+    # Per-participant read watermarks; messages up to last_read_message_id are read
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS conversation_reads (
+            conversation_id INTEGER REFERENCES conversations(id) ON DELETE CASCADE,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            last_read_message_id INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (conversation_id, user_id)
+        )
+    """)
+    
     # Activity logs table
     cur.execute("""
         CREATE TABLE IF NOT EXISTS activity_logs (
@@ -119,11 +130,25 @@ def create_tables():
     cur.execute("CREATE INDEX IF NOT EXISTS idx_posts_type ON posts(type)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_posts_category ON posts(category)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_posts_status ON posts(status)")
+    # Partial indexes backing range filters and facet counts on active posts
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_posts_active_funding ON posts(funding_amount) WHERE status = 'active'")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_posts_active_interest_rate ON posts(interest_rate) WHERE status = 'active'")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_posts_active_type_category ON posts(type, category, created_at DESC) WHERE status = 'active'")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id)")
+    # Unread counts range-scan messages past the read watermark without touching the heap
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_conversation_unread ON messages(conversation_id, id) INCLUDE (sender_id)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_activity_logs_user_id ON activity_logs(user_id)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_activity_logs_action ON activity_logs(action)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_users_firebase_uid ON users(firebase_uid)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
+    # User directory: role/location filters, keyset sort orders and fuzzy name/company search
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_users_role_location ON users(role, location)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_users_location ON users(location)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_users_rating_sort ON users((COALESCE(rating, 0)) DESC, id DESC)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_users_profile_views_sort ON users((COALESCE(profile_views, 0)) DESC, id DESC)")
+    cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_users_name_trgm ON users USING GIN (name gin_trgm_ops)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_users_company_trgm ON users USING GIN (company gin_trgm_ops)")
     
     # Create trigger to update updated_at timestamp
     cur.execute("""